@@ -1,7 +1,11 @@
 # Club.py
 from flask import Flask,render_template, redirect, url_for, request, flash, session
+from sqlalchemy import text
 from model import db, Member, Payment, Event, Project, Announcement
 import Controller
+import backup
+import click
+import os
 from datetime import datetime
 
 app = Flask(__name__)
@@ -11,9 +15,14 @@ app.secret_key = "dev-secret"  # change for production
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///club.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
+app.config['BACKUP_DIR'] = os.path.join(app.instance_path, 'backups')
+app.config['BACKUP_KEEP'] = 7
 
 with app.app_context():
     db.create_all()
+    # WAL lets requests keep writing while a backup holds a read snapshot
+    db.session.execute(text('PRAGMA journal_mode=WAL'))
+    db.session.commit()
 
 # Home
 @app.route('/')
@@ -361,5 +370,58 @@ def signup():
 def error():
     return render_template('error.html')
 
+# ---- Backups (flask --app Club backup ...) ----
+def _db_path():
+    return db.engine.url.database
+
+@app.cli.group('backup')
+def backup_cli():
+    """Online snapshots of the club database."""
+
+@backup_cli.command('create')
+@click.option('--dest', default=None, help='Snapshot directory (defaults to BACKUP_DIR)')
+@click.option('--keep', default=None, type=click.IntRange(min=1), help='Number of snapshots to keep')
+@click.option('--no-compress', is_flag=True, help='Write a plain .db file instead of .db.gz')
+def backup_create(dest, keep, no_compress):
+    dest = dest or app.config['BACKUP_DIR']
+    path = backup.snapshot(_db_path(), dest, compress=not no_compress)
+    removed = backup.prune(dest, keep if keep is not None else app.config['BACKUP_KEEP'])
+    click.echo(f"Snapshot written to {path} ({len(removed)} old snapshot(s) removed)")
+
+@backup_cli.command('schedule')
+@click.option('--dest', default=None, help='Snapshot directory (defaults to BACKUP_DIR)')
+@click.option('--every', default=3600, type=int, help='Seconds between snapshots')
+@click.option('--keep', default=None, type=click.IntRange(min=1), help='Number of snapshots to keep')
+@click.option('--no-compress', is_flag=True, help='Write plain .db files instead of .db.gz')
+def backup_schedule(dest, every, keep, no_compress):
+    backup.run_schedule(_db_path(), dest or app.config['BACKUP_DIR'], every,
+                        keep if keep is not None else app.config['BACKUP_KEEP'], compress=not no_compress, log=click.echo)
+
+@backup_cli.command('list')
+@click.option('--dest', default=None, help='Snapshot directory (defaults to BACKUP_DIR)')
+def backup_list(dest):
+    for path in backup.list_snapshots(dest or app.config['BACKUP_DIR']):
+        click.echo(f"{path}  {os.path.getsize(path)} bytes")
+
+@backup_cli.command('verify')
+@click.argument('snapshot', type=click.Path(exists=True, dir_okay=False))
+def backup_verify(snapshot):
+    problems = backup.verify(snapshot, tables=db.metadata.tables)
+    if problems:
+        for p in problems:
+            click.echo(p, err=True)
+        raise click.ClickException('Snapshot is corrupt')
+    click.echo('Snapshot OK')
+
+@backup_cli.command('restore')
+@click.argument('snapshot', type=click.Path(exists=True, dir_okay=False))
+@click.confirmation_option(prompt='This overwrites the live database. Continue?')
+def backup_restore(snapshot):
+    try:
+        backup.restore(snapshot, _db_path(), tables=db.metadata.tables)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Database restored from {snapshot}")
+
 if __name__ == '__main__':
     app.run(debug=True)
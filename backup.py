@@ -0,0 +1,202 @@
+# backup.py
+# Online snapshots of the club database using SQLite's backup API.
+# Pages are copied in small steps with a short pause between them, so the app
+# keeps serving requests while a snapshot is taken.
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zlib
+from urllib.request import pathname2url
+from datetime import datetime, timezone
+
+SNAPSHOT_PREFIX = 'club-'
+SNAPSHOT_SUFFIX = '.db.gz'
+
+class _BackupRestarted(Exception):
+    pass
+
+# -------------------------
+# Snapshots
+# -------------------------
+def copy_pages(src, dst, pages, sleep, max_restarts, progress=None):
+    # SQLite restarts a stepped backup whenever another connection writes to the
+    # source, so under steady writes it may never finish. After `max_restarts`
+    # restarts, copy the rest in one pass; in WAL mode that only holds a read
+    # snapshot and writers carry on. Returns the number of restarts seen.
+    state = {'remaining': None, 'restarts': 0}
+
+    def _progress(status, remaining, total):
+        # a step that copied pages always lowers `remaining`; if it didn't, the copy started over
+        if status == sqlite3.SQLITE_OK and state['remaining'] is not None and remaining >= state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise _BackupRestarted()
+        state['remaining'] = remaining
+        if progress:
+            progress(status, remaining, total)
+        # sqlite3's own `sleep` only applies after a busy step, so pause here to
+        # let requests run between steps; the source read lock is released meanwhile
+        if status == sqlite3.SQLITE_OK and remaining > 0:
+            time.sleep(sleep)
+
+    try:
+        src.backup(dst, pages=pages, progress=_progress, sleep=sleep)
+    except _BackupRestarted:
+        src.backup(dst, pages=-1)
+    return state['restarts']
+
+def snapshot(db_path, dest_dir, pages=256, sleep=0.005, compress=True, max_restarts=3, progress=None):
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Database {db_path} not found")
+    os.makedirs(dest_dir, exist_ok=True)
+    # UTC so names keep sorting in time order across daylight saving changes
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    name = f"{SNAPSHOT_PREFIX}{stamp}.db"
+    tmp_path = os.path.join(dest_dir, name + '.part')
+    final_path = os.path.join(dest_dir, name + '.gz' if compress else name)
+
+    try:
+        src = sqlite3.connect(db_path)
+        dst = sqlite3.connect(tmp_path)
+        try:
+            # copy `pages` pages per step, then pause for `sleep` seconds
+            copy_pages(src, dst, pages, sleep, max_restarts, progress)
+            # keep the snapshot a single self-contained file, without -wal/-shm
+            dst.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            dst.close()
+            src.close()
+
+        if compress:
+            with open(tmp_path, 'rb') as f_in, gzip.open(final_path + '.part', 'wb', compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+            os.remove(tmp_path)
+            os.replace(final_path + '.part', final_path)
+        else:
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        # don't leave partial files behind; prune never sees them and they can be huge
+        for path in (tmp_path, tmp_path + '-journal', final_path + '.part'):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return final_path
+
+def list_snapshots(dest_dir):
+    if not os.path.isdir(dest_dir):
+        return []
+    names = [n for n in os.listdir(dest_dir)
+             if n.startswith(SNAPSHOT_PREFIX) and (n.endswith('.db') or n.endswith(SNAPSHOT_SUFFIX))]
+    # UTC timestamps in the names sort chronologically, oldest first
+    return [os.path.join(dest_dir, n) for n in sorted(names)]
+
+def prune(dest_dir, keep):
+    if keep < 1:
+        raise ValueError("keep must be at least 1")
+    removed = list_snapshots(dest_dir)[:-keep]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+# -------------------------
+# Verify / restore
+# -------------------------
+def _open_snapshot(path):
+    # returns (plain db path, is_temporary)
+    if not path.endswith('.gz'):
+        return path, False
+    fd, tmp_path = tempfile.mkstemp(suffix='.db')
+    try:
+        with os.fdopen(fd, 'wb') as f_out, gzip.open(path, 'rb') as f_in:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, True
+
+def _verify_plain(plain_path, tables):
+    # checks an uncompressed snapshot; returns a list of problems
+    try:
+        # quote the path so ?, # or % in a file name are not read as URI syntax
+        conn = sqlite3.connect(f"file:{pathname2url(plain_path)}?mode=ro", uri=True)
+        try:
+            rows = conn.execute('PRAGMA integrity_check').fetchall()
+            names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    problems = [r[0] for r in rows]
+    if problems != ['ok']:
+        return problems
+    # an empty file passes integrity_check, but restoring it would wipe the database
+    if not names:
+        return ['snapshot has no tables']
+    if tables and not names.intersection(tables):
+        return ['snapshot has none of the expected tables: ' + ', '.join(sorted(tables))]
+    return []
+
+def verify(path, tables=None):
+    # returns a list of problems, empty when the snapshot is sound.
+    # `tables` are the names a club database should have; at least one must be present.
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Snapshot {path} not found")
+    try:
+        plain_path, is_tmp = _open_snapshot(path)
+    except (OSError, EOFError, zlib.error) as e:
+        return [f"cannot decompress: {e}"]
+    try:
+        return _verify_plain(plain_path, tables)
+    finally:
+        if is_tmp:
+            os.remove(plain_path)
+
+def restore(path, db_path, tables=None):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Snapshot {path} not found")
+    # decompress once, then check and copy from the same file
+    try:
+        plain_path, is_tmp = _open_snapshot(path)
+    except (OSError, EOFError, zlib.error) as e:
+        raise ValueError(f"Snapshot {path} failed verification: cannot decompress: {e}")
+    try:
+        problems = _verify_plain(plain_path, tables)
+        if problems:
+            raise ValueError(f"Snapshot {path} failed verification: {problems[0]}")
+        src = sqlite3.connect(plain_path)
+        dst = sqlite3.connect(db_path)
+        try:
+            # copy back through the backup API so open connections see a consistent db.
+            # Done in one pass: the write lock on db_path is held until the copy ends,
+            # so stepping would only keep app writers waiting longer.
+            src.backup(dst, pages=-1)
+        finally:
+            dst.close()
+            src.close()
+    finally:
+        if is_tmp:
+            os.remove(plain_path)
+    return db_path
+
+# -------------------------
+# Scheduling
+# -------------------------
+def run_schedule(db_path, dest_dir, interval, keep, compress=True, runs=None, log=print):
+    # takes a snapshot every `interval` seconds and keeps only the newest `keep`
+    done = 0
+    while runs is None or done < runs:
+        started = time.monotonic()
+        try:
+            path = snapshot(db_path, dest_dir, compress=compress)
+            removed = prune(dest_dir, keep)
+            log(f"Snapshot written to {path} ({len(removed)} old snapshot(s) removed)")
+        except Exception as e:
+            # one failed run (disk full, locked file...) must not stop the schedule
+            log(f"Snapshot failed: {e}")
+        done += 1
+        if runs is not None and done >= runs:
+            break
+        time.sleep(max(0, interval - (time.monotonic() - started)))
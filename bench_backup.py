@@ -0,0 +1,120 @@
+# bench_backup.py
+"""Measures request latency while an online backup runs.
+
+Builds a throwaway database of the requested size, then runs a worker that
+does short read/write "requests" against it, first with no backup and then
+while backup.copy_pages() copies it in steps. Only the page copy is timed;
+compressing the finished snapshot does not touch the live database.
+
+  python bench_backup.py --size-mb 2048
+
+Sample run, 2046 MB database, 1 CPU:
+  --write-ratio 0    no backup p99 0.100ms, during backup p99 0.087ms (12.8s, no restarts)
+  --write-ratio 0.1  no backup p99 0.438ms, during backup p99 9.827ms, max 158ms
+                     (2.5s; restarted 4 times, finished in one pass)
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import backup
+
+def build_db(path, size_mb):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('CREATE TABLE members (id INTEGER PRIMARY KEY, email TEXT, notes TEXT)')
+    blob = 'x' * 1000
+    # each row takes about 1.37 KB on disk
+    rows = size_mb * 730
+    batch = 10000
+    for start in range(0, rows, batch):
+        conn.executemany('INSERT INTO members (email, notes) VALUES (?, ?)',
+                         ((f"m{i}@club.test", blob) for i in range(start, min(rows, start + batch))))
+        conn.commit()
+    conn.close()
+    return rows
+
+def request_loop(path, rows, stop, latencies, write_ratio):
+    conn = sqlite3.connect(path, timeout=30)
+    while not stop.is_set():
+        member_id = random.randint(1, rows)
+        t0 = time.perf_counter()
+        if random.random() < write_ratio:
+            conn.execute('UPDATE members SET email = ? WHERE id = ?', (f"u{member_id}@club.test", member_id))
+            conn.commit()
+        else:
+            conn.execute('SELECT email FROM members WHERE id = ?', (member_id,)).fetchone()
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(0.001)
+    conn.close()
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def report(label, latencies, elapsed):
+    ms = [v * 1000 for v in latencies]
+    print(f"{label:<16} requests={len(ms):>7}  p50={percentile(ms, 50):7.3f}ms  "
+          f"p99={percentile(ms, 99):8.3f}ms  max={max(ms):8.3f}ms  ({elapsed:.1f}s)")
+
+def copy_db(path, dest_path, args):
+    src = sqlite3.connect(path)
+    dst = sqlite3.connect(dest_path)
+    try:
+        return backup.copy_pages(src, dst, args.pages, args.sleep, args.max_restarts)
+    finally:
+        dst.close()
+        src.close()
+
+def run_phase(path, rows, args, with_backup, dest_path):
+    latencies = []
+    stop = threading.Event()
+    worker = threading.Thread(target=request_loop, args=(path, rows, stop, latencies, args.write_ratio))
+    worker.start()
+    restarts = None
+    t0 = time.perf_counter()
+    if with_backup:
+        restarts = copy_db(path, dest_path, args)
+    else:
+        time.sleep(args.baseline_seconds)
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    worker.join()
+    return latencies, elapsed, restarts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=2048)
+    parser.add_argument('--pages', type=int, default=256, help='pages copied per backup step')
+    parser.add_argument('--sleep', type=float, default=0.005, help='pause between backup steps (s)')
+    parser.add_argument('--max-restarts', type=int, default=3,
+                        help='restarts before the copy finishes in one pass')
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--baseline-seconds', type=float, default=10)
+    parser.add_argument('--workdir', default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(dir=args.workdir)
+    try:
+        path = os.path.join(workdir, 'club.db')
+        print(f"Building {args.size_mb} MB database in {workdir} ...")
+        rows = build_db(path, args.size_mb)
+        print(f"Database size: {os.path.getsize(path) / 1e6:.0f} MB")
+
+        latencies, elapsed, _ = run_phase(path, rows, args, False, None)
+        report('no backup', latencies, elapsed)
+        latencies, elapsed, restarts = run_phase(path, rows, args, True, os.path.join(workdir, 'snapshot.db'))
+        report('during backup', latencies, elapsed)
+        fallback = 'yes' if restarts > args.max_restarts else 'no'
+        print(f"backup restarts={restarts}  one-pass fallback={fallback}")
+    finally:
+        shutil.rmtree(workdir)
+
+if __name__ == '__main__':
+    main()
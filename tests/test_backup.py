@@ -0,0 +1,253 @@
+# tests/test_backup.py
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+import backup
+
+CLUB_TABLES = ['members', 'payments']
+
+
+@pytest.fixture
+def club_db(tmp_path):
+    path = str(tmp_path / 'club.db')
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('CREATE TABLE members (id INTEGER PRIMARY KEY, email TEXT)')
+    conn.execute('CREATE TABLE payments (id INTEGER PRIMARY KEY, member_id INTEGER, amount REAL)')
+    conn.executemany('INSERT INTO members (email) VALUES (?)', [(f"m{i}@club.test",) for i in range(2000)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def tmp_tempdir(tmp_path, monkeypatch):
+    # route tempfile.mkstemp into a private dir so leaked files can be seen
+    path = tmp_path / 'tmp'
+    path.mkdir()
+    monkeypatch.setattr(backup.tempfile, 'tempdir', str(path))
+    return path
+
+
+def _count_members(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM members').fetchone()[0]
+    finally:
+        conn.close()
+
+
+# -------------------------
+# Snapshot / verify / restore
+# -------------------------
+@pytest.mark.parametrize('compress', [True, False])
+def test_snapshot_verify_restore_round_trip(club_db, tmp_path, compress):
+    snap = backup.snapshot(club_db, str(tmp_path / 'backups'), compress=compress)
+    assert snap.endswith('.db.gz' if compress else '.db')
+    assert backup.verify(snap, CLUB_TABLES) == []
+
+    conn = sqlite3.connect(club_db)
+    conn.execute('DELETE FROM members')
+    conn.commit()
+    conn.close()
+    assert _count_members(club_db) == 0
+
+    backup.restore(snap, club_db, CLUB_TABLES)
+    assert _count_members(club_db) == 2000
+
+
+def test_snapshot_is_single_file(club_db, tmp_path):
+    dest = tmp_path / 'backups'
+    backup.snapshot(club_db, str(dest), compress=False)
+    names = os.listdir(dest)
+    assert len(names) == 1
+    assert names[0].startswith('club-') and names[0].endswith('Z.db')
+
+
+def test_failed_copy_leaves_no_files(club_db, tmp_path):
+    def fail(status, remaining, total):
+        raise OSError('disk full')
+
+    dest = tmp_path / 'backups'
+    with pytest.raises(OSError):
+        backup.snapshot(club_db, str(dest), pages=1, progress=fail)
+    assert os.listdir(dest) == []
+
+
+def test_failed_compress_leaves_no_files(club_db, tmp_path, monkeypatch):
+    def fail(f_in, f_out, length=0):
+        f_out.write(b'partial')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(backup.shutil, 'copyfileobj', fail)
+    dest = tmp_path / 'backups'
+    with pytest.raises(OSError):
+        backup.snapshot(club_db, str(dest))
+    assert os.listdir(dest) == []
+
+
+def test_verify_path_with_uri_characters(club_db, tmp_path):
+    snap = backup.snapshot(club_db, str(tmp_path / 'backups'), compress=False)
+    odd = str(tmp_path / 'club-a?b#c%20d.db')
+    os.rename(snap, odd)
+    assert backup.verify(odd, CLUB_TABLES) == []
+
+
+def test_snapshot_missing_db(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        backup.snapshot(str(tmp_path / 'nope.db'), str(tmp_path / 'backups'))
+
+
+# -------------------------
+# Retention
+# -------------------------
+def test_prune_keeps_newest(club_db, tmp_path):
+    dest = str(tmp_path / 'backups')
+    paths = [backup.snapshot(club_db, dest) for _ in range(4)]
+    removed = backup.prune(dest, 2)
+    assert removed == paths[:2]
+    assert backup.list_snapshots(dest) == paths[2:]
+
+
+def test_prune_rejects_zero(tmp_path):
+    with pytest.raises(ValueError):
+        backup.prune(str(tmp_path), 0)
+
+
+def test_run_schedule_applies_retention(club_db, tmp_path):
+    dest = str(tmp_path / 'backups')
+    lines = []
+    backup.run_schedule(club_db, dest, 0, 2, runs=3, log=lines.append)
+    assert len(lines) == 3
+    assert len(backup.list_snapshots(dest)) == 2
+
+
+def test_run_schedule_survives_failed_run(club_db, tmp_path, monkeypatch):
+    real_snapshot = backup.snapshot
+    calls = []
+
+    def flaky_snapshot(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError('disk full')
+        return real_snapshot(*args, **kwargs)
+
+    monkeypatch.setattr(backup, 'snapshot', flaky_snapshot)
+    dest = str(tmp_path / 'backups')
+    lines = []
+    backup.run_schedule(club_db, dest, 0, 2, runs=2, log=lines.append)
+    assert lines[0] == 'Snapshot failed: disk full'
+    assert lines[1].startswith('Snapshot written to')
+    assert len(backup.list_snapshots(dest)) == 1
+
+
+# -------------------------
+# Bad snapshots
+# -------------------------
+def test_verify_rejects_corrupt_gzip(club_db, tmp_path, tmp_tempdir):
+    snap = backup.snapshot(club_db, str(tmp_path / 'backups'))
+    data = bytearray(open(snap, 'rb').read())
+    data[200:260] = bytes(60)
+    bad = tmp_path / 'club-corrupt.db.gz'
+    bad.write_bytes(bytes(data))
+
+    problems = backup.verify(str(bad))
+    assert problems and problems[0].startswith('cannot decompress')
+    assert os.listdir(tmp_tempdir) == []
+
+
+def test_verify_rejects_truncated_gzip(club_db, tmp_path, tmp_tempdir):
+    snap = backup.snapshot(club_db, str(tmp_path / 'backups'))
+    bad = tmp_path / 'club-truncated.db.gz'
+    bad.write_bytes(open(snap, 'rb').read()[:500])
+
+    problems = backup.verify(str(bad))
+    assert problems and problems[0].startswith('cannot decompress')
+    assert os.listdir(tmp_tempdir) == []
+
+
+def test_verify_rejects_non_database(tmp_path):
+    bad = tmp_path / 'club-garbage.db.gz'
+    bad.write_bytes(gzip.compress(b'garbage' * 1000))
+    assert backup.verify(str(bad)) != []
+
+
+def test_restore_decompresses_once(club_db, tmp_path, tmp_tempdir, monkeypatch):
+    snap = backup.snapshot(club_db, str(tmp_path / 'backups'))
+    real_open = backup._open_snapshot
+    calls = []
+
+    def counting_open(path):
+        calls.append(path)
+        return real_open(path)
+
+    monkeypatch.setattr(backup, '_open_snapshot', counting_open)
+    backup.restore(snap, club_db, CLUB_TABLES)
+    assert calls == [snap]
+    assert os.listdir(tmp_tempdir) == []
+
+
+def test_restore_refuses_corrupt_gzip(club_db, tmp_path, tmp_tempdir):
+    bad = tmp_path / 'club-truncated.db.gz'
+    bad.write_bytes(open(backup.snapshot(club_db, str(tmp_path / 'backups')), 'rb').read()[:500])
+    with pytest.raises(ValueError):
+        backup.restore(str(bad), club_db, CLUB_TABLES)
+    assert _count_members(club_db) == 2000
+    assert os.listdir(tmp_tempdir) == []
+
+
+def test_restore_refuses_empty_snapshot(club_db, tmp_path):
+    empty = tmp_path / 'club-empty.db'
+    empty.write_bytes(b'')
+    assert backup.verify(str(empty)) == ['snapshot has no tables']
+
+    with pytest.raises(ValueError):
+        backup.restore(str(empty), club_db, CLUB_TABLES)
+    assert _count_members(club_db) == 2000
+
+
+def test_restore_refuses_foreign_database(club_db, tmp_path):
+    other = str(tmp_path / 'club-other.db')
+    conn = sqlite3.connect(other)
+    conn.execute('CREATE TABLE something_else (x)')
+    conn.commit()
+    conn.close()
+
+    assert backup.verify(other) == []
+    assert backup.verify(other, CLUB_TABLES) != []
+    with pytest.raises(ValueError):
+        backup.restore(other, club_db, CLUB_TABLES)
+    assert _count_members(club_db) == 2000
+
+
+# -------------------------
+# Restart handling
+# -------------------------
+class _FakeSource:
+    # replays a fixed sequence of `remaining` counts through the progress callback
+    def __init__(self, remaining):
+        self.remaining = remaining
+        self.calls = []
+
+    def backup(self, dst, pages=-1, progress=None, sleep=0.25):
+        self.calls.append(pages)
+        if pages == -1:
+            return
+        for r in self.remaining:
+            progress(sqlite3.SQLITE_OK if r else sqlite3.SQLITE_DONE, r, 100)
+
+
+def test_copy_pages_counts_restart_at_same_count():
+    # 90 -> 90 means the step after a restart landed on the same count
+    src = _FakeSource([90, 80, 90, 90, 80, 0])
+    assert backup.copy_pages(src, None, 10, 0, 5) == 2
+    assert src.calls == [10]
+
+
+def test_copy_pages_falls_back_to_one_pass():
+    src = _FakeSource([90, 90, 90, 90, 0])
+    assert backup.copy_pages(src, None, 10, 0, 1) == 2
+    assert src.calls == [10, -1]